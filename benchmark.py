@@ -0,0 +1,111 @@
+"""
+Model-free micro-benchmarks for the tool functions at several data sizes.
+
+Each size installs a seeded synthetic dataset (synthetic_data.py), then times the tools
+directly with their console output discarded. Per-call cases report the mean time per
+call, and the "x smallest" column compares it with the smallest size: it should stay
+near 1.0, and a value that grows with the row count points to a scaling regression.
+
+    python benchmark.py                       # 1k, 100k and 1M rows
+    python benchmark.py --sizes 1000 10000 --json results.json
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import agent
+from synthetic_data import load_synthetic_data
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_SAMPLES = 1_000 # Calls per per-call case
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    """Seconds taken by `fn`, with stdout discarded."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+
+def run_size(rows: int, samples: int, seed: int) -> List[Dict[str, Any]]:
+    agent.use_memory_storage()
+    agent.bureau_score_cache.clear()
+    dataset = load_synthetic_data(rows, seed=seed)
+    rng = random.Random(seed)
+    sample = rng.sample(dataset.applications, min(samples, rows))
+    results: List[Dict[str, Any]] = []
+
+    def record(case: str, seconds: float, calls: int = 1) -> None:
+        results.append({
+            "case": case,
+            "rows": rows,
+            "calls": calls,
+            "seconds": seconds,
+            "per_call_us": seconds / calls * 1e6,
+        })
+
+    def lookups(tool: Callable[..., Any], *fields: str) -> Callable[[], None]:
+        def run() -> None:
+            for app in sample:
+                tool(*(app[field] for field in fields))
+        return run
+
+    def updates() -> None:
+        for app in sample:
+            agent.update_application_record_and_log(app["ApplicationID"], "Rejected - DTI Exceeds Threshold", "Benchmark: DTI too high.")
+
+    gc.collect()
+    record("initialize_run_data (first run)", _timed(agent.initialize_run_data))
+    record("initialize_run_data (reset)", _timed(agent.initialize_run_data))
+    record("get_new_applications", _timed(agent.get_new_applications))
+    record("get_credit_score_from_bureau", _timed(
+        lookups(agent.get_credit_score_from_bureau, "ApplicationID", "CustomerID", "SSN_Last4")), len(sample))
+    record("get_kyc_details_from_db", _timed(
+        lookups(agent.get_kyc_details_from_db, "ApplicationID", "CustomerID")), len(sample))
+    record("check_application_velocity", _timed(lookups(agent.check_application_velocity, "ApplicationID")), len(sample))
+    record("update_application_record_and_log", _timed(updates), len(sample))
+    record("get_run_summary", _timed(lambda: [agent.get_run_summary() for _ in sample]), len(sample))
+    record("display_full_mock_db_snapshot_and_summary", _timed(agent.display_full_mock_db_snapshot_and_summary))
+    with tempfile.TemporaryDirectory() as directory:
+        record("export_processed_log (jsonl)", _timed(
+            lambda: agent.export_processed_log(os.path.join(directory, "log.jsonl"), format="jsonl")), len(sample))
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    smallest: Dict[str, float] = {}
+    print(f"{'case':<45} | {'rows':>9} | {'calls':>6} | {'total s':>9} | {'per call us':>12} | {'x smallest':>10}")
+    print("-" * 107)
+    for result in results:
+        per_call = result["per_call_us"]
+        baseline = smallest.setdefault(result["case"], per_call)
+        ratio = per_call / baseline if baseline else 0.0
+        print(f"{result['case']:<45} | {result['rows']:>9} | {result['calls']:>6} | {result['seconds']:>9.4f} | {per_call:>12.2f} | {ratio:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the credit reviewer tool functions without a model.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="row counts to benchmark")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="calls per per-call case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for rows in sorted(args.sizes):
+        results.extend(run_size(rows, args.samples, args.seed))
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Offline end-to-end load harness: run_agent_workflow driven by a scripted stand-in model.
+
+ScriptedWorkflowModel plays the model's part of agent_instructions. It calls the tools
+in the order the instructions describe, applies the decision matrix to what they return
+and waits a configurable latency per turn, so whole runs can be measured without a
+Gemini endpoint. The harness installs it on root_agent and application_worker_agent,
+runs generated batches (synthetic_data.py) and reports throughput, tool calls per
+application and latency percentiles per orchestration strategy.
+
+    python load_harness.py --sizes 100 500 --strategies sequential bulk_enrichment fast_path
+    python load_harness.py --sizes 200 --concurrency 1 8 --latency-ms 200 --jitter-ms 50
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Tuple
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+from pydantic import PrivateAttr
+
+import agent
+from synthetic_data import load_synthetic_data
+
+STRATEGIES = ("sequential", "bulk_enrichment", "fast_path")
+WORKER_PROMPT_PREFIX = "Pre-screen this credit card application:\n"
+PAGE_SIZE = 100 # The instructions switch to paging above 100 applications
+
+# A plan yields steps: lists of independent tool calls (name, args). It is sent the
+# unwrapped responses of each step and returns the final text.
+Step = List[Tuple[str, Dict[str, Any]]]
+Plan = Generator[Step, List[Any], str]
+
+
+def _unwrap(response: Dict[str, Any]) -> Any:
+    """ADK wraps non-dict tool results as {"result": value}."""
+    return response["result"] if set(response) == {"result"} else response
+
+
+def _records(payload: Any) -> List[Dict[str, Any]]:
+    return agent.decode_table(payload) if isinstance(payload, dict) and "columns" in payload else list(payload)
+
+
+def _record_and_notify(app: Dict[str, Any], decision: Dict[str, Any]) -> Step:
+    return [
+        ("update_application_record_and_log", {
+            "application_id": app["ApplicationID"],
+            "final_status": decision["FinalStatus"],
+            "orchestrator_notes": decision["OrchestratorNotes"],
+            "rule_version": decision["RuleVersion"],
+        }),
+        ("send_credit_decision_email", {
+            "email_address": app["Email"],
+            "customer_first_name": app["FirstName"],
+            "customer_last_name": app["LastName"],
+            "decision_status": decision["EmailDecisionStatus"],
+            "reason": decision["EmailReason"],
+            "application_id": app["ApplicationID"],
+        }),
+    ]
+
+
+def _evaluate(app: Dict[str, Any], enrichment: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+    """An evaluate_application call: the Age/DTI check alone, or the final decision given enrichment."""
+    if enrichment is None:
+        return ("evaluate_application", {"application_id": app["ApplicationID"]})
+    return ("evaluate_application", {"application_id": app["ApplicationID"], "credit_score": enrichment.get("CreditScore"),
+                                     "kyc_status": enrichment.get("KYCStatus"), "enrichment_done": True})
+
+
+def _application_plan(app: Dict[str, Any]) -> Generator[Step, List[Any], Dict[str, Any]]:
+    """Steps c-f for one application: the eligibility check, enrichment only when it passes, then log and email."""
+    [decision] = yield [_evaluate(app)]
+    if decision["NeedsEnrichment"]:
+        credit, kyc = yield [
+            ("get_credit_score_from_bureau", {"application_id": app["ApplicationID"], "customer_id": app["CustomerID"], "ssn_last4": app["SSN_Last4"]}),
+            ("get_kyc_details_from_db", {"application_id": app["ApplicationID"], "customer_id": app["CustomerID"]}),
+        ]
+        enrichment = {"CreditScore": credit["CreditScore"] if credit else None, "KYCStatus": kyc["KYCStatus"] if kyc else None}
+        [decision] = yield [_evaluate(app, enrichment)]
+    yield _record_and_notify(app, decision)
+    return decision
+
+
+def _page_plan(strategy: str, page: List[Dict[str, Any]]) -> Generator[Step, List[Any], List[str]]:
+    """Step 3 for one page of applications; returns their FinalStatus values."""
+    statuses = []
+    if strategy == "bulk_enrichment":
+        # Check c for the whole page in one turn, one enrichment call, then step f for the survivors in one turn
+        checks = yield [_evaluate(app) for app in page]
+        decisions = {check["ApplicationID"]: check for check in checks}
+        eligible = [app for app in page if decisions[app["ApplicationID"]]["NeedsEnrichment"]]
+        if eligible:
+            [enriched] = yield [("get_enrichment_for_applications", {"applications": [
+                {"ApplicationID": app["ApplicationID"], "CustomerID": app["CustomerID"], "SSN_Last4": app["SSN_Last4"]}
+                for app in eligible
+            ]})]
+            enrichment = {record["ApplicationID"]: record for record in _records(enriched)}
+            finals = yield [_evaluate(app, enrichment[app["ApplicationID"]]) for app in eligible]
+            decisions.update((final["ApplicationID"], final) for final in finals)
+        for app in page:
+            decision = decisions[app["ApplicationID"]]
+            yield _record_and_notify(app, decision)
+            statuses.append(decision["FinalStatus"])
+    else:
+        for app in page:
+            decision = yield from _application_plan(app)
+            statuses.append(decision["FinalStatus"])
+    return statuses
+
+
+def orchestrator_plan(strategy: str) -> Plan:
+    """The root_agent workflow: initialize, fetch, decide every application, summarize."""
+    [init_message] = yield [("initialize_run_data", {})]
+    pending_count = int(init_message.split(". ")[1].split()[0]) # "... run data. N applications are ready ..."
+    statuses: List[str] = []
+    if strategy == "fast_path":
+        # Screened pages carry the applicant fields the email needs, so step 2b is skipped
+        cursor: Optional[str] = ""
+        while cursor is not None:
+            [screened] = yield [("screen_pending_applications", {"cursor": cursor, "page_size": agent.MAX_PAGE_SIZE})]
+            for decision in _records(screened["decisions"]):
+                yield _record_and_notify(decision, decision)
+                statuses.append(decision["FinalStatus"])
+            cursor = screened["next_cursor"]
+    elif pending_count <= PAGE_SIZE: # Step 2b: one get_new_applications call
+        [payload] = yield [("get_new_applications", {})]
+        statuses += yield from _page_plan(strategy, _records(payload))
+    else:
+        # Step 2b for large batches: process each page, then fetch the next. Cursors are table positions
+        # (rowids with SQLite), so applications decided meanwhile do not shift later pages.
+        cursor = ""
+        while cursor is not None:
+            [page] = yield [("get_pending_applications_page", {"cursor": cursor, "page_size": PAGE_SIZE})]
+            statuses += yield from _page_plan(strategy, _records(page["applications"]))
+            cursor = page["next_cursor"]
+    [summary] = yield [("get_run_summary", {})]
+    return (f"I have processed {len(statuses)} applications from the current batch. {summary['approved']} were Approved, "
+            f"{summary['rejected']} were Rejected and {summary['manual_review']} have been sent for Manual Review.")
+
+
+def worker_plan(app: Dict[str, Any]) -> Plan:
+    """The application_worker_agent workflow for the single application in the prompt."""
+    decision = yield from _application_plan(app)
+    return f"{app['ApplicationID']}: {decision['FinalStatus']}"
+
+
+class ScriptedWorkflowModel(BaseLlm):
+    """
+    Stand-in model that replays a plan against the conversation so far. Each turn it
+    re-runs the plan, feeding it the recorded tool responses, and emits the next step:
+    all of its calls at once when parallel_tool_calls is set, otherwise one call per turn.
+    Every turn sleeps latency_ms (plus Gaussian jitter_ms) and reports estimated
+    usage_metadata (characters / 4), so token_report works offline too.
+    """
+    model: str = "scripted-workflow"
+    strategy: str = "sequential"
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    parallel_tool_calls: bool = True
+    seed: int = 0
+    _rng: random.Random = PrivateAttr(default=None)
+    turn_latencies_ms: List[float] = []
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    def _plan_for(self, request: LlmRequest) -> Plan:
+        first_text = next(part.text for content in request.contents for part in content.parts or [] if part.text)
+        if first_text.startswith(WORKER_PROMPT_PREFIX):
+            return worker_plan(json.loads(first_text[len(WORKER_PROMPT_PREFIX):]))
+        return orchestrator_plan(self.strategy)
+
+    def _next_turn(self, request: LlmRequest) -> genai_types.Content:
+        responses = [_unwrap(part.function_response.response or {})
+                     for content in request.contents for part in content.parts or [] if part.function_response]
+        plan = self._plan_for(request)
+        step, consumed = next(plan), 0
+        while len(responses) - consumed >= len(step): # Replay every step whose calls have all been answered
+            step_responses = responses[consumed:consumed + len(step)]
+            consumed += len(step)
+            try:
+                step = plan.send(step_responses)
+            except StopIteration as done:
+                return genai_types.Content(role="model", parts=[genai_types.Part(text=done.value)])
+        answered = len(responses) - consumed
+        calls = step[answered:] if self.parallel_tool_calls else step[answered:answered + 1]
+        return genai_types.Content(role="model", parts=[
+            genai_types.Part(function_call=genai_types.FunctionCall(name=name, args=args)) for name, args in calls
+        ])
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        started = time.perf_counter()
+        delay_ms = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+        content = self._next_turn(llm_request)
+        prompt_chars = len(str(llm_request.config.system_instruction or "")) + sum(
+            len(part.text or "") + len(json.dumps(part.function_response.response, default=str) if part.function_response else "")
+            + len(json.dumps(part.function_call.args, default=str) if part.function_call else "")
+            for request_content in llm_request.contents for part in request_content.parts or []
+        )
+        output_chars = sum(len(part.text or "") + len(json.dumps(part.function_call.args) if part.function_call else "") for part in content.parts)
+        self.turn_latencies_ms.append((time.perf_counter() - started) * 1000)
+        yield LlmResponse(
+            content=content,
+            usage_metadata=genai_types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=(prompt_chars + 3) // 4, candidates_token_count=(output_chars + 3) // 4,
+            ),
+        )
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99)}
+
+
+def run_load_test(applications: int, strategy: str = "sequential", max_concurrency: int = 1,
+                  latency_ms: float = 0.0, jitter_ms: float = 0.0, parallel_tool_calls: bool = True,
+                  seed: int = 0) -> Dict[str, Any]:
+    """One run_agent_workflow over a generated batch; returns throughput, call counts and latency percentiles."""
+    agent.use_memory_storage()
+    agent.use_run_checkpoint(None)
+    load_synthetic_data(applications, seed=seed)
+    model = ScriptedWorkflowModel(strategy=strategy, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                                  parallel_tool_calls=parallel_tool_calls, seed=seed)
+    agent.root_agent.model = model
+    agent.application_worker_agent.model = model
+    # The orchestrator handles the whole batch in one session, so ADK's default call limit is too low for large batches
+    agent.MAX_LLM_CALLS_PER_SESSION = 8 * applications + 50
+
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(agent.run_agent_workflow(max_concurrency=max_concurrency))
+    elapsed = time.perf_counter() - started
+
+    run = agent._run_generation
+    processed = len(agent._run_records()[1])
+    spans = [span for span in agent.tool_metrics.spans if span.run == run]
+    usage = agent.model_token_usage.get(run, {})
+    return {
+        "strategy": strategy,
+        "applications": applications,
+        "max_concurrency": max_concurrency,
+        "parallel_tool_calls": parallel_tool_calls,
+        "latency_ms": latency_ms,
+        "processed": processed,
+        "still_pending": len(agent._pending_applications()),
+        "seconds": round(elapsed, 3),
+        "applications_per_second": round(processed / elapsed, 2) if elapsed else None,
+        "model_turns_per_application": round(len(model.turn_latencies_ms) / processed, 2) if processed else None,
+        "tool_calls_per_application": round(len(spans) / processed, 2) if processed else None,
+        "prompt_tokens_per_application": round(usage.get("prompt_tokens", 0) / processed, 1) if processed else None,
+        "tool_latency_ms": _percentiles([span.duration_ms for span in spans]),
+        "model_turn_latency_ms": _percentiles(model.turn_latencies_ms),
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"{'strategy':<16} | {'apps':>6} | {'conc':>4} | {'par':>3} | {'apps/s':>8} | {'turns/app':>9} | {'tools/app':>9} | "
+          f"{'tokens/app':>10} | {'tool p50/p99 ms':>17} | {'turn p50/p99 ms':>17}")
+    print("-" * 130)
+    for result in results:
+        tool, turn = result["tool_latency_ms"], result["model_turn_latency_ms"]
+        tool_latency = f"{tool['p50']}/{tool['p99']}"
+        turn_latency = f"{turn['p50']}/{turn['p99']}"
+        print(f"{result['strategy']:<16} | {result['applications']:>6} | {result['max_concurrency']:>4} | "
+              f"{'yes' if result['parallel_tool_calls'] else 'no':>3} | {result['applications_per_second']:>8} | "
+              f"{result['model_turns_per_application']:>9} | {result['tool_calls_per_application']:>9} | "
+              f"{result['prompt_tokens_per_application']:>10} | {tool_latency:>17} | {turn_latency:>17}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test run_agent_workflow offline with a scripted stand-in model.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100], help="applications per generated batch")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1],
+                        help="run_agent_workflow max_concurrency values (above 1, worker sessions follow the sequential steps)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated model latency per turn")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="standard deviation of the simulated latency")
+    parser.add_argument("--one-call-per-turn", action="store_true", help="emit one tool call per model turn instead of parallel calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for concurrency in args.concurrency:
+            # Worker sessions ignore the orchestrator strategy, so one run per concurrency level suffices
+            strategies = args.strategies if concurrency == 1 else ["sequential"]
+            for strategy in strategies:
+                results.append(run_load_test(size, strategy, concurrency, args.latency_ms, args.jitter_ms,
+                                             not args.one_call_per_turn, args.seed))
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Seeded synthetic data for the credit application reviewer.
+
+generate_dataset(n) returns applications shaped like _initial_new_applications_data_template,
+plus bureau scores and KYC records covering roughly the same share of applicants as the
+hand-written templates. The same seed and as-of date always yield the same rows.
+
+    python synthetic_data.py 100000 --seed 7 --csv-dir data/
+"""
+import argparse
+import csv
+import os
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import agent
+
+FIRST_NAMES = ["John", "Alice", "Robert", "Maria", "David", "Susan", "Michael", "Linda", "James", "Patricia",
+               "Wei", "Priya", "Carlos", "Fatima", "Olivia", "Noah", "Emma", "Liam", "Sofia", "Yusuf"]
+LAST_NAMES = ["Smith", "Wonder", "Jones", "Garcia", "Lee", "Chen", "Brown", "Davis", "Miller", "Wilson",
+              "Patel", "Nguyen", "Kim", "Lopez", "Khan", "Taylor", "Thomas", "Moore", "Martin", "Clark"]
+CITIES = [("New York", "NY"), ("Los Angeles", "CA"), ("Chicago", "IL"), ("Houston", "TX"), ("Phoenix", "AZ"),
+          ("Philadelphia", "PA"), ("San Antonio", "TX"), ("San Diego", "CA"), ("Dallas", "TX"), ("Seattle", "WA")]
+# (value, weight) pairs
+EMPLOYMENT_STATUSES = [("Employed", 60), ("Self-Employed", 15), ("Student", 10), ("Retired", 10), ("Unemployed", 5)]
+MARITAL_STATUSES = [("Single", 45), ("Married", 40), ("Divorced", 10), ("Widowed", 5)]
+KYC_STATUSES = [("Updated", 60), ("Not Updated", 25), ("Unknown", 15)]
+CREDIT_LIMITS = [500.0, 1000.0, 2500.0, 5000.0, 7000.0, 8000.0, 10000.0, 15000.0, 20000.0]
+
+# The templates cover 10 of 15 applicants in each of the bureau and KYC tables
+DEFAULT_COVERAGE = 10 / 15
+
+
+class SyntheticDataset(NamedTuple):
+    applications: List[Dict[str, Any]]
+    credit_scores: List[Dict[str, Any]]
+    kyc_records: List[Dict[str, Any]]
+
+
+def _weighted(pairs):
+    values, weights = zip(*pairs)
+    return list(values), list(weights)
+
+
+def generate_dataset(n: int, seed: int = 0, as_of: Optional[date] = None,
+                     bureau_coverage: float = DEFAULT_COVERAGE,
+                     kyc_coverage: float = DEFAULT_COVERAGE) -> SyntheticDataset:
+    """
+    `n` pending applications with matching bureau and KYC rows. Ages, DTI, scores and KYC
+    statuses are spread so every branch of the decision matrix is exercised.
+    """
+    rng = random.Random(seed)
+    as_of = as_of or date.today()
+    employment, employment_weights = _weighted(EMPLOYMENT_STATUSES)
+    marital, marital_weights = _weighted(MARITAL_STATUSES)
+    kyc_statuses, kyc_weights = _weighted(KYC_STATUSES)
+    # Pre-formatted so rows share one string object per distinct date
+    recent_dates = [(as_of - timedelta(days=offset)).isoformat() for offset in range(90)]
+    kyc_dates = [(as_of - timedelta(days=offset)).isoformat() for offset in range(0, 5 * 365, 7)]
+
+    applications: List[Dict[str, Any]] = []
+    credit_scores: List[Dict[str, Any]] = []
+    kyc_records: List[Dict[str, Any]] = []
+    for i in range(1, n + 1):
+        application_id = f"APP{i:07d}"
+        customer_id = f"CUST{i:07d}"
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        city, state = rng.choice(CITIES)
+        date_of_birth = as_of - timedelta(days=rng.randint(16 * 365, 80 * 365))
+        income = float(rng.randrange(200, 15001, 50))
+        ssn_last4 = f"{rng.randrange(10000):04d}"
+        applications.append({
+            "ApplicationID": application_id,
+            "CustomerID": customer_id,
+            "SubmissionDate": recent_dates[rng.randrange(7)],
+            "FirstName": first_name,
+            "LastName": last_name,
+            "Email": f"{first_name}.{last_name}{i}@email.fake".lower(),
+            "DateOfBirth": date_of_birth.isoformat(),
+            "EmploymentStatus": rng.choices(employment, employment_weights)[0],
+            "GrossMonthlyIncome": income,
+            # Up to 60% of income, so roughly a third of applicants fail the DTI check
+            "TotalMonthlyDebtPayments": float(round(income * rng.uniform(0.0, 0.6), -1)),
+            "RequestedCreditLimit": rng.choice(CREDIT_LIMITS),
+            "SSN_Last4": ssn_last4,
+            "MaritalStatus": rng.choices(marital, marital_weights)[0],
+            "AddressCity": city,
+            "AddressState": state,
+            "FinalStatus": "Pending Review",
+            "OrchestratorNotes": "",
+        })
+        if rng.random() < bureau_coverage:
+            credit_scores.append({
+                "ApplicationID": application_id,
+                "CustomerID": customer_id,
+                "SSN_Last4": ssn_last4,
+                "CreditScore": max(300, min(850, int(rng.gauss(700, 70)))),
+                "BureauReportDate": rng.choice(recent_dates),
+            })
+        if rng.random() < kyc_coverage:
+            kyc_status = rng.choices(kyc_statuses, kyc_weights)[0]
+            kyc_records.append({
+                "ApplicationID": application_id,
+                "CustomerID": customer_id,
+                "KYCStatus": kyc_status,
+                "LastKYCVerificationDate": None if kyc_status == "Unknown" else rng.choice(kyc_dates),
+            })
+    return SyntheticDataset(applications, credit_scores, kyc_records)
+
+
+def load_synthetic_data(n: int, seed: int = 0, **kwargs) -> SyntheticDataset:
+    """Generates a dataset and installs it as the agent's templates (see agent.set_data_templates)."""
+    dataset = generate_dataset(n, seed=seed, **kwargs)
+    agent.set_data_templates(*dataset)
+    return dataset
+
+
+def write_csv(dataset: SyntheticDataset, directory: str) -> None:
+    """One CSV per table, named after its mock_db key, loadable with SQLiteStore.load_csv."""
+    os.makedirs(directory, exist_ok=True)
+    for table, records in zip(("new_credit_applications", "credit_bureau_scores", "kyc_database"), dataset):
+        with open(os.path.join(directory, f"{table}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=agent._TABLE_COLUMNS[table], extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic credit application data.")
+    parser.add_argument("count", type=int, help="number of applications")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv-dir", default="synthetic_csv", help="output directory for the CSV files")
+    args = parser.parse_args()
+    dataset = generate_dataset(args.count, seed=args.seed)
+    write_csv(dataset, args.csv_dir)
+    print(f"Wrote {len(dataset.applications)} applications, {len(dataset.credit_scores)} bureau scores "
+          f"and {len(dataset.kyc_records)} KYC records to {args.csv_dir}/")
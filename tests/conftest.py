@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import agent.py as a top-level module, as load_harness.py and benchmark.py do.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
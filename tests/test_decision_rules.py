@@ -0,0 +1,97 @@
+"""Decision rules: outcomes for the template batch, hot reload, and decisions from rules no longer in force."""
+import json
+import os
+from datetime import date
+
+import pytest
+
+import agent
+
+EXPECTED_FINAL_STATUS = {
+    "APP1001": "Approved",
+    "APP1002": "Rejected - Credit Score and KYC",
+    "APP1003": "Rejected - DTI Exceeds Threshold",
+    "APP1004": "Approved",
+    "APP1005": "Rejected - Credit Score and KYC",
+    "APP1006": "Pending Manual Review - KYC",
+    "APP1007": "Rejected - Credit Score and KYC",
+    "APP1008": "Rejected - DTI Exceeds Threshold",
+    "APP1009": "Rejected - Credit Score and KYC",
+    "APP1010": "Approved",
+    "APP1011": "Approved",
+    "APP1012": "Rejected - Credit Score and KYC",
+    "APP1013": "Rejected - DTI Exceeds Threshold",
+    "APP1014": "Approved",
+    "APP1015": "Rejected - Credit Score and KYC",
+}
+
+
+@pytest.fixture(autouse=True)
+def run(monkeypatch):
+    """A run as of 2026-06-01 (every template applicant is an adult by then) under decision_rules.json."""
+    for name in ("DECISION_RULES_PATH", "_decision_rules", "_decision_rules_file_state", "_decision_rules_checked_at"):
+        monkeypatch.setattr(agent, name, getattr(agent, name)) # Restored after the test, whatever it loads
+    monkeypatch.setattr(agent, "RUN_AS_OF_DATE", date(2026, 6, 1))
+    agent.use_decision_rules(os.path.join(os.path.dirname(agent.__file__), "decision_rules.json"))
+    agent.initialize_run_data()
+
+
+def write_rules(path, **changes):
+    with open(os.path.join(os.path.dirname(agent.__file__), "decision_rules.json"), encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(changes)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return str(path)
+
+
+def rows(payload):
+    if isinstance(payload, dict): # LEAN_TOOL_PAYLOADS table
+        return [dict(zip(payload["columns"], row)) for row in payload["rows"]]
+    return payload
+
+
+def test_template_batch_outcomes():
+    result = agent.screen_pending_applications(page_size=agent.MAX_PAGE_SIZE)
+
+    assert result["next_cursor"] is None
+    assert {d["ApplicationID"]: d["FinalStatus"] for d in rows(result["decisions"])} == EXPECTED_FINAL_STATUS
+
+
+def test_invalid_rules_file_keeps_previous_version(tmp_path):
+    path = write_rules(tmp_path / "rules.json", version="test-1")
+    agent.use_decision_rules(path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": "test-2", "thresholds": {"minimum_age": 18}}, f)
+    agent._reload_decision_rules_if_changed(force=True)
+
+    assert agent.current_decision_rules().version == "test-1"
+    with pytest.raises(ValueError):
+        agent.use_decision_rules(path)
+    assert agent.evaluate_application("APP1003")["RuleVersion"] == "test-1"
+
+
+def test_decision_from_replaced_rules_is_refused(tmp_path):
+    decision = agent.evaluate_application("APP1003")
+    agent.use_decision_rules(write_rules(tmp_path / "rules.json", version="test-2"))
+
+    result = agent.update_application_record_and_log("APP1003", decision["FinalStatus"], decision["OrchestratorNotes"], decision["RuleVersion"])
+
+    assert result.startswith(f"Error: rules version '{decision['RuleVersion']}' is no longer in force")
+    assert agent._find_record("new_credit_applications", "APP1003")["FinalStatus"] == "Pending Review"
+    decision = agent.evaluate_application("APP1003")
+    agent.update_application_record_and_log("APP1003", decision["FinalStatus"], decision["OrchestratorNotes"], decision["RuleVersion"])
+    assert agent.get_run_summary()["decisions_logged"] == 1
+    assert agent._run_records()[1][-1]["RuleVersion"] == "test-2"
+
+
+def test_velocity_alert_ends_the_notes_without_changing_the_decision():
+    app = agent._find_record("new_credit_applications", "APP1001")
+    for i in range(2): # Same applicant twice more within the window
+        agent._admit_application(agent._ingest_application({**app, "ApplicationID": f"APP900{i}"}, date(2026, 6, 1)))
+
+    plain = agent.evaluate_application("APP1001", 750, "Updated", enrichment_done=True)
+    checked = agent.evaluate_application("APP1001", 750, "Updated", enrichment_done=True, check_velocity=True)
+
+    assert checked["FinalStatus"] == plain["FinalStatus"] == "Approved"
+    assert checked["OrchestratorNotes"] == plain["OrchestratorNotes"] + " Velocity alert: SSN_Last4=2, Email=2, CustomerID=2"
@@ -0,0 +1,56 @@
+"""Email outbox: queue-time validation, and a notification that cannot be rendered failing alone."""
+import threading
+
+import pytest
+
+import agent
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.batches = []
+
+    def send_batch(self, emails):
+        self.batches.append([email.to for email in emails])
+
+
+@pytest.fixture(autouse=True)
+def transport(monkeypatch):
+    recording = RecordingTransport()
+    agent.set_email_transport(recording)
+    monkeypatch.setattr(agent, "email_outbox_stats", dict.fromkeys(agent.email_outbox_stats, 0))
+    yield recording
+    agent.flush_email_outbox()
+    agent.set_email_transport(agent.ConsoleEmailTransport())
+
+
+def test_invalid_email_is_refused_when_queued(transport):
+    result = agent.send_credit_decision_email("john.smith@email.fake", "John", None, "Approved")
+    agent.flush_email_outbox()
+
+    assert result.startswith("Error: customer_last_name")
+    assert agent.email_outbox_stats["queued"] == 0
+    assert transport.batches == []
+
+
+def test_unrenderable_notification_does_not_fail_its_batch(transport):
+    sending, release = threading.Event(), threading.Event()
+
+    class BlockingTransport(RecordingTransport):
+        def send_batch(self, emails):
+            sending.set()
+            release.wait() # Holds the dispatcher so the next three notifications form one batch
+            super().send_batch(emails)
+
+    blocking = BlockingTransport()
+    agent.set_email_transport(blocking)
+    agent.send_credit_decision_email("john.smith@email.fake", "John", "Smith", "Approved")
+    sending.wait()
+    agent._enqueue_email(agent.EmailNotification("john.smith@email.fake", "John", "Smith", "Approved", None))
+    agent._enqueue_email(agent.EmailNotification("alice.wonder@email.fake", "Alice", None, "Approved", None))
+    agent._enqueue_email(agent.EmailNotification("robert.jones@email.fake", "Robert", "Jones", "Rejected", "DTI too high."))
+    release.set()
+    agent.flush_email_outbox()
+
+    assert blocking.batches == [["john.smith@email.fake"], ["john.smith@email.fake", "robert.jones@email.fake"]]
+    assert agent.email_outbox_stats == {"queued": 4, "sent": 3, "retried": 0, "failed": 1, "batches": 2}
@@ -0,0 +1,187 @@
+"""Run checkpoint resume and idempotency, replayed through the in-memory and SQLite stores."""
+import json
+
+import pytest
+
+import agent
+
+
+class RecordingTransport:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.emails = []
+
+    def send_batch(self, emails):
+        if self.fail:
+            raise ConnectionError("transport down")
+        self.emails.extend(emails)
+
+
+@pytest.fixture(autouse=True)
+def transport():
+    recording = RecordingTransport()
+    agent.set_email_transport(recording)
+    yield recording
+    agent.flush_email_outbox()
+    agent.use_run_checkpoint(None)
+    agent.set_email_transport(agent.ConsoleEmailTransport())
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        agent.use_sqlite_storage(str(tmp_path / "store.db"))
+    yield request.param
+    agent.use_memory_storage()
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "run.jsonl")
+
+
+def restart(store, tmp_path, journal_path):
+    """What a new process does: reopen the store and the journal, then initialize the run."""
+    agent.flush_email_outbox()
+    if store == "sqlite":
+        agent.use_sqlite_storage(str(tmp_path / "store.db"))
+    agent.use_run_checkpoint(journal_path)
+    return agent.initialize_run_data()
+
+
+def status_of(application_id):
+    return agent._find_record("new_credit_applications", application_id)["FinalStatus"]
+
+
+def decide(application_id, final_status="Approved"):
+    return agent.update_application_record_and_log(application_id, final_status, f"{final_status} in test.")
+
+
+def test_resume_after_torn_final_line(store, tmp_path, journal_path):
+    agent.use_run_checkpoint(journal_path)
+    agent.initialize_run_data()
+    decide("APP1001")
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"type": "decision", "ApplicationID": "APP10') # Crash mid-write
+
+    message = restart(store, tmp_path, journal_path)
+
+    assert "Resumed an interrupted run: 1 applications" in message
+    assert status_of("APP1001") == "Approved"
+    assert status_of("APP1002") == "Pending Review"
+    decide("APP1002", "Rejected - Underage")
+    with open(journal_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f] # Every line parses: the torn record was truncated
+    assert [r["ApplicationID"] for r in records if r["type"] == "decision"] == ["APP1001", "APP1002"]
+    assert agent.get_run_summary()["decisions_logged"] == 2
+
+
+def test_decisions_are_not_repeated_after_restart(store, tmp_path, journal_path):
+    agent.use_run_checkpoint(journal_path)
+    agent.initialize_run_data()
+    decide("APP1001")
+
+    restart(store, tmp_path, journal_path)
+    result = decide("APP1001", "Rejected - Underage")
+
+    assert "already logged" in result
+    assert status_of("APP1001") == "Approved"
+    assert [entry["ApplicationID"] for entry in agent._run_records()[1]] == ["APP1001"]
+
+
+def test_emails_are_sent_once_across_restarts(store, tmp_path, journal_path, transport):
+    agent.use_run_checkpoint(journal_path)
+    agent.initialize_run_data()
+    agent.send_credit_decision_email("john.smith@email.fake", "John", "Smith", "Approved", application_id="APP1001")
+    agent.flush_email_outbox()
+
+    restart(store, tmp_path, journal_path)
+    result = agent.send_credit_decision_email("john.smith@email.fake", "John", "Smith", "Approved", application_id="APP1001")
+    agent.flush_email_outbox()
+
+    assert "Not sent again" in result
+    assert [email.to for email in transport.emails] == ["john.smith@email.fake"]
+
+
+def test_undelivered_emails_are_requeued_on_resume(store, tmp_path, journal_path, monkeypatch):
+    monkeypatch.setattr(agent, "EMAIL_MAX_RETRIES", 0)
+    agent.set_email_transport(RecordingTransport(fail=True))
+    agent.use_run_checkpoint(journal_path)
+    agent.initialize_run_data()
+    agent.send_credit_decision_email("alice.wonder@email.fake", "Alice", "Wonder", "Approved", application_id="APP1002")
+    agent.flush_email_outbox()
+
+    delivered = RecordingTransport()
+    agent.set_email_transport(delivered)
+    restart(store, tmp_path, journal_path)
+    agent.flush_email_outbox()
+    restart(store, tmp_path, journal_path) # Now journaled as sent, so not queued a third time
+    agent.flush_email_outbox()
+
+    assert [email.to for email in delivered.emails] == ["alice.wonder@email.fake"]
+
+
+def test_shard_journals_are_merged_once(store, tmp_path, journal_path, transport):
+    agent.use_run_checkpoint(journal_path)
+    agent.initialize_run_data()
+    # What a shard process leaves behind when the parent dies before merging its results
+    shard = agent.RunCheckpoint(journal_path + ".shard0")
+    shard.begin_run(agent._current_as_of_date())
+    shard.record_decision({"ApplicationID": "APP1003", "FinalStatus": "Rejected - DTI Exceeds Threshold",
+                           "OrchestratorNotes": "DTI too high.", "Timestamp": "2024-06-01T12:00:00",
+                           "RuleVersion": "builtin-1", "Category": "rejected"})
+    notification = agent.EmailNotification("robert.jones@email.fake", "Robert", "Jones", "Rejected", "DTI too high.")
+    shard.record_email_queued("email:APP1003", notification._asdict())
+
+    restart(store, tmp_path, journal_path)
+    assert agent._merge_shard_checkpoints() == 1
+    assert agent._merge_shard_checkpoints() == 0
+    agent.flush_email_outbox()
+
+    assert status_of("APP1003") == "Rejected - DTI Exceeds Threshold"
+    assert [email.to for email in transport.emails] == ["robert.jones@email.fake"]
+    assert "email:APP1003" in agent._run_checkpoint.sent_emails
+    assert not (tmp_path / "run.jsonl.shard0").exists()
+
+
+def test_failed_session_leaves_the_run_open(store, tmp_path, journal_path, transport, monkeypatch):
+    async def session(runner, prompt, user_id="batch_operator"):
+        application_id = user_id.removeprefix("worker_")
+        if application_id == "APP1005":
+            raise RuntimeError("429 Too Many Requests")
+        app = agent._find_record("new_credit_applications", application_id)
+        decide(application_id)
+        agent.send_credit_decision_email(app["Email"], app["FirstName"], app["LastName"], "Approved", application_id=application_id)
+        return f"{application_id}: Approved"
+
+    monkeypatch.setattr(agent, "_run_agent_session", session)
+    agent.use_run_checkpoint(journal_path)
+    agent.asyncio.run(agent.run_agent_workflow(max_concurrency=4))
+
+    assert not agent._run_checkpoint.completed
+    sent = len(transport.emails)
+    message = restart(store, tmp_path, journal_path)
+    agent.flush_email_outbox()
+
+    assert f"Resumed an interrupted run: {sent} applications" in message
+    assert status_of("APP1005") == "Pending Review"
+    assert len(transport.emails) == sent # Nothing decided or emailed twice
+
+
+def test_decision_email_is_queued_on_resume(store, tmp_path, journal_path, transport):
+    agent.use_run_checkpoint(journal_path)
+    agent.initialize_run_data()
+    decision = agent.evaluate_application("APP1002", enrichment_done=True)
+    agent.update_application_record_and_log("APP1002", decision["FinalStatus"], decision["OrchestratorNotes"], decision["RuleVersion"])
+    decide("APP1001")
+    # Crash before either send_credit_decision_email call
+
+    restart(store, tmp_path, journal_path)
+    agent.flush_email_outbox()
+    restart(store, tmp_path, journal_path)
+    agent.flush_email_outbox()
+
+    assert sorted(email.to for email in transport.emails) == ["alice.wonder@email.fake", "john.smith@email.fake"]
+    alice = next(email for email in transport.emails if email.to == "alice.wonder@email.fake")
+    assert decision["EmailReason"] in alice.body
+    assert {"email:APP1001", "email:APP1002"} <= agent._run_checkpoint.sent_emails
@@ -0,0 +1,76 @@
+"""Screening across pages, replayed through the in-memory and SQLite stores."""
+import pytest
+
+import agent
+
+TEMPLATE_IDS = [f"APP{1001 + i}" for i in range(15)]
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.emails = []
+
+    def send_batch(self, emails):
+        self.emails.extend(emails)
+
+
+@pytest.fixture(autouse=True)
+def transport():
+    recording = RecordingTransport()
+    agent.set_email_transport(recording)
+    yield recording
+    agent.flush_email_outbox()
+    agent.set_email_transport(agent.ConsoleEmailTransport())
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        agent.use_sqlite_storage(str(tmp_path / "store.db"))
+    agent.initialize_run_data()
+    yield request.param
+    agent.use_memory_storage()
+
+
+def rows(payload):
+    if isinstance(payload, dict): # LEAN_TOOL_PAYLOADS table
+        return [dict(zip(payload["columns"], row)) for row in payload["rows"]]
+    return payload
+
+
+def screen_pages(page_size, record=False):
+    """ApplicationIDs of each page, following next_cursor; with `record`, each page is logged before the next is read."""
+    pages, cursor = [], ""
+    while cursor is not None:
+        result = agent.screen_pending_applications(cursor=cursor, page_size=page_size)
+        decisions = rows(result["decisions"])
+        pages.append([decision["ApplicationID"] for decision in decisions])
+        if record:
+            for decision in decisions:
+                agent.update_application_record_and_log(decision["ApplicationID"], decision["FinalStatus"],
+                                                        decision["OrchestratorNotes"], decision["RuleVersion"])
+        cursor = result["next_cursor"]
+    return pages
+
+
+@pytest.mark.parametrize("record", [False, True], ids=["read_only", "recording"])
+def test_cursor_pages_cover_every_application_once(store, record):
+    pages = screen_pages(page_size=4, record=record)
+
+    assert [len(page) for page in pages] == [4, 4, 4, 3]
+    assert sorted(sum(pages, [])) == TEMPLATE_IDS
+    assert agent.get_run_summary()["pending_review"] == (0 if record else 15)
+
+
+def test_apply_decisions_in_chunks(store, transport, monkeypatch):
+    monkeypatch.setattr(agent, "SCREEN_APPLY_CHUNK_SIZE", 4)
+
+    result = agent.screen_pending_applications(apply_decisions=True)
+    agent.flush_email_outbox()
+
+    assert result["screened_count"] == result["decisions_logged"] == 15
+    assert result["run_summary"]["pending_review"] == 0
+    assert sorted(entry["ApplicationID"] for entry in agent._run_records()[1]) == TEMPLATE_IDS
+    assert len(transport.emails) == 15
+    assert len({email.to for email in transport.emails}) == 15
+    assert agent.screen_pending_applications(apply_decisions=True)["screened_count"] == 0